@@ -1,9 +1,39 @@
-import os
-import re
+import sys
 import time
+
+# Each group of eager imports is timed for the startup profile. Under
+# `streamlit run` the server has already imported Streamlit, so that import
+# is labelled as preloaded rather than reported as a suspiciously fast load.
+SCRIPT_STARTED = time.perf_counter()
+IMPORT_TIMES = {}
+
+import importlib.util
+import json
+import os
+import queue
+import tempfile
+import threading
+import uuid
+import weakref
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+IMPORT_TIMES["import stdlib"] = time.perf_counter() - SCRIPT_STARTED
+
+_import_started = time.perf_counter()
+_streamlit_preloaded = "streamlit" in sys.modules
 import streamlit as st
-from datetime import datetime
-from html import escape
+
+IMPORT_TIMES[
+    "import streamlit (preloaded)" if _streamlit_preloaded else "import streamlit"
+] = time.perf_counter() - _import_started
+
+_import_started = time.perf_counter()
+from formatting import IncrementalFormatter, format_message_content
+
+IMPORT_TIMES["import formatting"] = time.perf_counter() - _import_started
 
 st.set_page_config(
     page_title="MAGnus - MA Group Knowledge Bot", 
@@ -12,8 +42,96 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Remove all sidebar CSS - we're switching to a top bar approach
-st.markdown("""
+
+# ---------- Startup profiling ----------
+class StartupProfiler:
+    """Time spent in imports and screen renders, first (cold) and latest.
+
+    Stages are always timed; the report is only shown when
+    MAGNUS_PROFILE_STARTUP is set.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = {"first": seconds, "last": seconds, "count": 1}
+                if profiling_enabled():
+                    print(f"[startup] {name}: {seconds * 1000:.1f} ms", file=sys.stderr)
+            else:
+                stage["last"] = seconds
+                stage["count"] += 1
+
+    def record_once(self, name, seconds):
+        """Record a stage only the first time, e.g. imports on the first run"""
+        with self._lock:
+            if name in self.stages:
+                return
+        self.record(name, seconds)
+
+    def report(self, budget_ms):
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+        lines = [f"{'stage':<36}{'first ms':>10}{'last ms':>10}{'runs':>6}"]
+        for name, stage in stages.items():
+            lines.append(
+                f"{name:<36}{stage['first'] * 1000:>10.1f}{stage['last'] * 1000:>10.1f}{stage['count']:>6}"
+            )
+        cold = stages.get(COLD_START_STAGE)
+        if cold is not None:
+            cold_ms = cold["first"] * 1000
+            verdict = "within" if cold_ms <= budget_ms else "OVER"
+            lines.append(f"cold start to login {cold_ms:.1f} ms ({verdict} {budget_ms:.0f} ms budget)")
+        return "\n".join(lines)
+
+# Script start to the login page rendered, on the first run of the process
+COLD_START_STAGE = "script start to login rendered"
+
+@st.cache_resource
+def get_startup_profiler():
+    return StartupProfiler()
+
+def profiling_enabled():
+    return str(get_secret("MAGNUS_PROFILE_STARTUP", "")).lower() in ("1", "true", "yes")
+
+@contextmanager
+def profile_stage(name):
+    """Time a block under name in the startup profile"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        get_startup_profiler().record(name, elapsed)
+
+def show_startup_profile():
+    if not profiling_enabled():
+        return
+    with st.expander("⏱️ Startup profile"):
+        st.code(get_startup_profiler().report(float(get_secret("STARTUP_BUDGET_MS", 500))))
+
+# ---------- Styles ----------
+@st.cache_resource
+def read_css():
+    """styles.css contents, read from disk once per process"""
+    with open('styles.css') as f:
+        return f.read()
+
+def load_css():
+    """Load external CSS file"""
+    try:
+        st.markdown(f'<style>{read_css()}</style>', unsafe_allow_html=True)
+    except FileNotFoundError:
+        st.error("CSS file not found. Please ensure 'styles.css' is in the same directory as your app.")
+
+def inject_top_bar_css():
+    """Top bar styles; only the main app needs them"""
+    # Remove all sidebar CSS - we're switching to a top bar approach
+    st.markdown("""
 <style>
 /* Hide the sidebar completely */
 section[data-testid="stSidebar"] {
@@ -115,18 +233,8 @@ section[data-testid="stSidebar"] {
     }
 }
 </style>
-""", unsafe_allow_html=True)
-
-def load_css():
-    """Load external CSS file"""
-    try:
-        with open('styles.css') as f:
-            st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
-    except FileNotFoundError:
-        st.error("CSS file not found. Please ensure 'styles.css' is in the same directory as your app.")
+    """, unsafe_allow_html=True)
 
-# Load CSS
-load_css()
 
 def display_logo():
     """Display the MAGnus logo with enhanced styling"""
@@ -157,54 +265,6 @@ def create_avatar_chip(role):
     else:
         return '<div class="avatar-chip assistant"><i class="bot-icon">🤖</i> MAGnus</div>'
 
-def format_message_content(text):
-    """Convert lightweight Markdown to HTML for display"""
-    if not text:
-        return ""
-
-    safe_text = escape(text)
-    safe_text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", safe_text)
-    safe_text = re.sub(r"(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)", r"<em>\1</em>", safe_text)
-    safe_text = re.sub(r"`(.+?)`", r"<code>\1</code>", safe_text)
-
-    lines = safe_text.split("\n")
-    html_parts = []
-    buffer = []
-    in_list = False
-
-    def flush_buffer():
-        nonlocal buffer
-        if buffer:
-            html_parts.append(f"<p>{'<br>'.join(buffer)}</p>")
-            buffer = []
-
-    for line in lines:
-        stripped = line.strip()
-
-        if stripped.startswith("- "):
-            flush_buffer()
-            if not in_list:
-                html_parts.append("<ul>")
-                in_list = True
-            html_parts.append(f"<li>{stripped[2:].strip()}</li>")
-        elif stripped == "":
-            flush_buffer()
-            if in_list:
-                html_parts.append("</ul>")
-                in_list = False
-        else:
-            if in_list:
-                html_parts.append("</ul>")
-                in_list = False
-            buffer.append(stripped)
-
-    flush_buffer()
-    if in_list:
-        html_parts.append("</ul>")
-
-    return "".join(html_parts) or "<p></p>"
-
-
 def display_message_with_custom_avatar(role, content):
     """Display chat message with enhanced custom avatar chip"""
     avatar_html = create_avatar_chip(role)
@@ -252,10 +312,11 @@ def typing_effect_with_avatar(text, role):
     time.sleep(0.5)
 
     displayed_text = ""
+    formatter = IncrementalFormatter()
     typing_delay = max(0.005, min(0.03, 0.6 / max(len(text), 1)))
     for char in text:
         displayed_text += char
-        formatted_content = format_message_content(displayed_text)
+        formatted_content = formatter.render(displayed_text)
         container.markdown(f"""
         <div class="chat-message-container assistant-message">
             <div class="avatar-container">
@@ -287,43 +348,391 @@ def typing_effect_with_avatar(text, role):
     """, unsafe_allow_html=True)
 
 # ---------- Dependencies ----------
-try:
-    from openai import AzureOpenAI
-    AZURE_OPENAI_AVAILABLE = True
-except Exception:
-    AZURE_OPENAI_AVAILABLE = False
+# Only checked for here; the AI stack is imported on first use so the login
+# screen never pays for it
+AZURE_OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None  # enables HTTP/2 in httpx
 
 # ---------- Utils ----------
 def get_secret(key, default=None):
     return os.getenv(key) or st.secrets.get(key, default)
 
-@st.cache_resource
-def get_azure_client():
+def build_azure_client():
     """Initialize Azure OpenAI client"""
     if not AZURE_OPENAI_AVAILABLE:
         return None
+    try:
+        with profile_stage("import openai"):
+            from openai import AzureOpenAI
+    except Exception:
+        return None
     
-    api_key = get_secret("AZURE_OPENAI_API_KEY")
-    endpoint = get_secret("AZURE_OPENAI_ENDPOINT")
-    api_version = get_secret("AZURE_OPENAI_API_VERSION", "2024-05-01-preview")
+    config = azure_client_config()
+    api_key, endpoint, api_version = config
     
     if not api_key or not endpoint:
         return None
     
-    return AzureOpenAI(
-        api_key=api_key,
-        api_version=api_version,
-        azure_endpoint=endpoint
+    transport = get_resource_registry().get("http_client")
+    if transport is None:
+        client = AzureOpenAI(
+            api_key=api_key,
+            api_version=api_version,
+            azure_endpoint=endpoint
+        )
+    else:
+        client = AzureOpenAI(
+            api_key=api_key,
+            api_version=api_version,
+            azure_endpoint=endpoint,
+            http_client=transport,
+            timeout=transport.timeout,
+        )
+    get_client_configs()[client] = config
+    return client
+
+def azure_client_config():
+    """Every setting the Azure client is built from"""
+    return (
+        get_secret("AZURE_OPENAI_API_KEY"),
+        get_secret("AZURE_OPENAI_ENDPOINT"),
+        get_secret("AZURE_OPENAI_API_VERSION", "2024-05-01-preview"),
     )
 
+@st.cache_resource
+def get_client_configs():
+    """The config each live Azure client was built from"""
+    return weakref.WeakKeyDictionary()
+
+def check_azure_client(client):
+    """Client is healthy while the settings it was built from are unchanged"""
+    config = azure_client_config()
+    if client is None:
+        api_key, endpoint, _ = config
+        return not (api_key and endpoint)
+    return get_client_configs().get(client) == config
+
+def build_assistant(secret_key="AZURE_ASSISTANT_ID"):
+    """Retrieve the configured assistant using the shared client"""
+    client = get_resource_registry().get("azure_client")
+    assistant_id = get_secret(secret_key)
+    if not client or not assistant_id:
+        return None
+    return client.beta.assistants.retrieve(assistant_id)
+
+def check_assistant(assistant, secret_key="AZURE_ASSISTANT_ID"):
+    """Assistant is healthy if it can still be retrieved"""
+    if assistant is None:
+        return not get_secret(secret_key)
+    client = get_resource_registry().get("azure_client")
+    if not client:
+        return False
+    client.beta.assistants.retrieve(assistant.id)
+    return True
+
+# ---------- Transport ----------
+class TransportStats:
+    """Pool wait and connection reuse for the shared HTTP client.
+
+    Uses httpcore's trace hook: the time until a connection is opened or a
+    request starts on an existing one is how long the request waited for the
+    pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.reused = 0
+        self.pool_wait_total = 0.0
+        self.pool_wait_max = 0.0
+        self.connect_total = 0.0
+
+    def on_request(self, request):
+        started = time.perf_counter()
+        state = {"connect_started": None}
+
+        def trace(event, info):
+            if event == "connection.connect_tcp.started":
+                state["connect_started"] = time.perf_counter()
+                self._record_wait(time.perf_counter() - started, reused=False)
+            elif event.endswith(".send_request_headers.started"):
+                if state["connect_started"] is None:
+                    self._record_wait(time.perf_counter() - started, reused=True)
+                else:
+                    with self._lock:
+                        self.connect_total += time.perf_counter() - state["connect_started"]
+                    state["connect_started"] = None
+
+        request.extensions["trace"] = trace
+
+    def _record_wait(self, seconds, reused):
+        with self._lock:
+            self.requests += 1
+            self.reused += reused
+            self.pool_wait_total += seconds
+            self.pool_wait_max = max(self.pool_wait_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            new = self.requests - self.reused
+            return {
+                "requests": self.requests,
+                "reuse_rate": self.reused / self.requests if self.requests else 0.0,
+                "pool_wait_avg_ms": 1000 * self.pool_wait_total / self.requests if self.requests else 0.0,
+                "pool_wait_max_ms": 1000 * self.pool_wait_max,
+                "connect_avg_ms": 1000 * self.connect_total / new if new else 0.0,
+            }
+
+@st.cache_resource
+def get_transport_stats():
+    return TransportStats()
+
+def build_http_client():
+    """Shared, explicitly tuned HTTP transport for every Azure call"""
+    if not HTTPX_AVAILABLE:
+        return None
+    try:
+        with profile_stage("import httpx"):
+            import httpx
+    except Exception:
+        return None
+    
+    limits = httpx.Limits(
+        max_connections=int(get_secret("HTTP_MAX_CONNECTIONS", 50)),
+        max_keepalive_connections=int(get_secret("HTTP_MAX_KEEPALIVE", 20)),
+        keepalive_expiry=float(get_secret("HTTP_KEEPALIVE_SECONDS", 60)),
+    )
+    # Per-call limits; the overall run budget is max_wait in wait_for_run_completion
+    timeout = httpx.Timeout(
+        float(get_secret("HTTP_READ_TIMEOUT", 30)),
+        connect=float(get_secret("HTTP_CONNECT_TIMEOUT", 5)),
+        pool=float(get_secret("HTTP_POOL_TIMEOUT", 10)),
+    )
+    return httpx.Client(
+        limits=limits,
+        timeout=timeout,
+        http2=HTTP2_AVAILABLE and str(get_secret("HTTP2", "true")).lower() != "false",
+        event_hooks={"request": [get_transport_stats().on_request]},
+    )
+
+def transport_summary():
+    """One-line pool report for the footer"""
+    stats = get_transport_stats().snapshot()
+    if not stats["requests"]:
+        return "pool idle"
+    return (
+        f"{stats['reuse_rate']:.0%} connection reuse • "
+        f"pool wait {stats['pool_wait_avg_ms']:.1f}ms avg / {stats['pool_wait_max_ms']:.0f}ms max"
+    )
+
+# ---------- Resources ----------
+class ResourceRegistry:
+    """Process-wide shared resources with per-key invalidation.
+
+    Sessions that fetch an entry become its holders, along with everything it
+    depends on. Invalidating an entry replaces it on next use; the old value
+    is retired until its last holder moves to the new one or ends, then
+    closed if the key has a close function.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._specs = {}
+        self._entries = {}
+        self._retired = []
+        self._closer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="magnus-close")
+
+    def register(self, key, factory, health_check=None, depends_on=(), close=None):
+        with self._lock:
+            self._specs[key] = {
+                "factory": factory,
+                "health_check": health_check,
+                "depends_on": tuple(depends_on),
+                "close": close,
+                "build_lock": threading.Lock(),
+                "builds": 0,
+            }
+
+    def get(self, key, owner=None):
+        """Return the resource for key, building it if missing or invalidated"""
+        spec = self._specs[key]
+        value, found = self._acquire(key, owner)
+        if found:
+            return value
+        with spec["build_lock"]:
+            # Another session may have rebuilt it while we waited
+            value, found = self._acquire(key, owner)
+            if found:
+                return value
+            value = spec["factory"]()
+            with self._lock:
+                spec["builds"] += 1
+                self._entries[key] = {"value": value, "owners": set(), "built_at": time.time()}
+                finished = self._hold(key, owner)
+            self._close(finished)
+            return value
+
+    def _acquire(self, key, owner):
+        with self._lock:
+            if key not in self._entries:
+                return None, False
+            value = self._entries[key]["value"]
+            finished = self._hold(key, owner)
+        self._close(finished)
+        return value, True
+
+    def _hold(self, key, owner):
+        """Record owner on key and its dependencies; caller holds the lock.
+
+        Returns the retired entries owner was the last holder of.
+        """
+        if not owner:
+            return []
+        keys = [key] + self._dependencies(key)
+        for current in keys:
+            entry = self._entries.get(current)
+            if entry is not None:
+                entry["owners"].add(owner)
+        return self._let_go(owner, keys)
+
+    def _let_go(self, owner, keys=None):
+        finished = []
+        for entry in self._retired:
+            if keys is None or entry["key"] in keys:
+                entry["owners"].discard(owner)
+                if not entry["owners"]:
+                    finished.append(entry)
+        for entry in finished:
+            self._retired.remove(entry)
+        return finished
+
+    def _close(self, entries):
+        """Close finished values on a worker so callers never block on I/O"""
+        for entry in entries:
+            close = self._specs[entry["key"]]["close"]
+            if close is None:
+                continue
+            try:
+                self._closer.submit(close, entry["value"])
+            except RuntimeError:
+                pass  # Interpreter shutting down
+
+    def invalidate(self, key):
+        """Replace key and everything depending on it on next use"""
+        finished = []
+        with self._lock:
+            for current in [key] + self._dependents(key):
+                entry = self._entries.pop(current, None)
+                if entry is None:
+                    continue
+                retired = {"key": current, "value": entry["value"], "owners": entry["owners"]}
+                if entry["owners"]:
+                    self._retired.append(retired)
+                else:
+                    finished.append(retired)
+        self._close(finished)
+
+    def release(self, owner):
+        """Drop every reference held by owner, closing retired values it kept alive"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry["owners"].discard(owner)
+            finished = self._let_go(owner)
+        self._close(finished)
+
+    def refresh(self):
+        """Health-check every live entry and invalidate the ones that fail"""
+        with self._lock:
+            live = [(key, entry["value"]) for key, entry in self._entries.items()]
+        failed = []
+        for key, value in live:
+            check = self._specs[key]["health_check"]
+            if check is None or key in failed:
+                continue
+            try:
+                healthy = check(value)
+            except Exception:
+                healthy = False
+            if not healthy:
+                failed.append(key)
+                failed.extend(self._dependents(key))
+                self.invalidate(key)
+        return failed
+
+    def _dependencies(self, key):
+        found = []
+        pending = [key]
+        while pending:
+            for k in self._specs[pending.pop()]["depends_on"]:
+                if k not in found:
+                    found.append(k)
+                    pending.append(k)
+        return found
+
+    def _dependents(self, key):
+        found = []
+        pending = [key]
+        while pending:
+            current = pending.pop()
+            for k, spec in self._specs.items():
+                if current in spec["depends_on"] and k not in found:
+                    found.append(k)
+                    pending.append(k)
+        return found
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                key: {
+                    "refs": len(entry["owners"]),
+                    "retired": 0,
+                    "builds": self._specs[key]["builds"],
+                    "built_at": entry["built_at"],
+                }
+                for key, entry in self._entries.items()
+            }
+            for entry in self._retired:
+                key = entry["key"]
+                stats.setdefault(key, {
+                    "refs": 0, "retired": 0, "builds": self._specs[key]["builds"], "built_at": None,
+                })["retired"] += 1
+            return stats
+
+@st.cache_resource
+def get_resource_registry():
+    """Registry shared by every session on this process"""
+    registry = ResourceRegistry()
+    registry.register("http_client", build_http_client, close=lambda client: client and client.close())
+    registry.register(
+        "azure_client", build_azure_client, check_azure_client, depends_on=("http_client",)
+    )
+    registry.register(
+        "assistant", build_assistant, check_assistant, depends_on=("azure_client",)
+    )
+    registry.register(
+        "assistant_fast",
+        lambda: build_assistant("AZURE_FAST_ASSISTANT_ID"),
+        lambda assistant: check_assistant(assistant, "AZURE_FAST_ASSISTANT_ID"),
+        depends_on=("azure_client",),
+    )
+    return registry
+
+def get_resource(key):
+    """Fetch a shared resource on behalf of the current session"""
+    return get_resource_registry().get(key, owner=st.session_state.get("session_id"))
+
+def get_azure_client():
+    """Shared Azure OpenAI client"""
+    return get_resource("azure_client")
+
 def get_or_create_assistant(client):
     """Get existing assistant or create new one with file search"""
     assistant_id = get_secret("AZURE_ASSISTANT_ID")
     
     if assistant_id:
         try:
-            assistant = client.beta.assistants.retrieve(assistant_id)
-            return assistant
+            return get_resource("assistant")
         except Exception as e:
             st.error(f"Could not retrieve assistant {assistant_id}: {e}")
             return None
@@ -367,6 +776,23 @@ def create_thread_and_run(client, assistant_id, messages):
         st.error(f"Error creating thread and run: {e}")
         return None, None
 
+def add_message_and_run(client, thread_id, assistant_id, content):
+    """Add a user message to an existing thread and start a run"""
+    try:
+        client.beta.threads.messages.create(
+            thread_id=thread_id,
+            role="user",
+            content=content
+        )
+        run = client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=assistant_id
+        )
+        return run.id
+    except Exception as e:
+        st.error(f"Error adding message to thread: {e}")
+        return None
+
 def wait_for_run_completion(client, thread_id, run_id, max_wait=60):
     """Wait for assistant run to complete"""
     start_time = time.time()
@@ -409,15 +835,652 @@ def get_assistant_response(client, thread_id):
         st.error(f"Error retrieving assistant response: {e}")
         return None
 
+# ---------- Warm-up ----------
+class Warmup:
+    """Builds shared resources in the background at process start.
+
+    Retrieving the assistant also opens the client's TLS connection, so by the
+    time someone logs in the pool already holds a live connection.
+    """
+
+    STAGES = (
+        ("azure_client", "🔗 Connecting to Azure OpenAI..."),
+        ("assistant", "⚙️ Setting up AI Assistant..."),
+    )
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.stages = {key: {"status": "pending", "seconds": None, "error": None} for key, _ in self.STAGES}
+        self.login_to_ready = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Run the warm-up unless it is already running"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            for key, _ in self.STAGES:
+                self.stages[key] = {"status": "pending", "seconds": None, "error": None}
+            self._thread = threading.Thread(target=self._run, name="magnus-warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        for key, _ in self.STAGES:
+            self.stages[key] = {"status": "running", "seconds": None, "error": None}
+            started = time.perf_counter()
+            error = None
+            try:
+                ok = self.registry.get(key) is not None
+            except Exception as e:
+                ok, error = False, str(e)
+            self.stages[key] = {
+                "status": "done" if ok else "failed",
+                "seconds": time.perf_counter() - started,
+                "error": error,
+            }
+            if not ok:
+                return
+        # The fast routing tier is optional, so it is not a setup stage
+        try:
+            self.registry.get("assistant_fast")
+        except Exception:
+            pass
+
+    def pending(self):
+        """Stages that have not finished yet"""
+        return [key for key, _ in self.STAGES if self.stages[key]["status"] in ("pending", "running")]
+
+    def record_ready(self, seconds):
+        with self._lock:
+            self.login_to_ready.append(seconds)
+            del self.login_to_ready[:-100]
+
+@st.cache_resource
+def get_warmup():
+    """Start warming shared resources once per process"""
+    warmup = Warmup(get_resource_registry())
+    if AZURE_OPENAI_AVAILABLE:
+        warmup.start()
+    return warmup
+
+# ---------- Speculative threads ----------
+class ThreadPrefetcher:
+    """Creates a session's assistant thread while the user is still clicking.
+
+    Threads are seeded with the conversation as it will look once the category
+    is confirmed. A thread is only handed out if its seed still matches the
+    history exactly; anything unclaimed is deleted.
+    """
+
+    def __init__(self, registry, ttl=900):
+        self.registry = registry
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="magnus-thread")
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def prepare(self, session_id, messages):
+        """Start creating a thread seeded with messages, replacing any earlier one"""
+        self.sweep()
+        seed = [{"role": m["role"], "content": m["content"]} for m in messages]
+        with self._lock:
+            entry = self._pending.get(session_id)
+            if entry and entry["seed"] == seed:
+                return
+            self._pending[session_id] = {
+                "seed": seed,
+                "future": self._executor.submit(self._create, seed),
+                "created_at": time.time(),
+            }
+        if entry:
+            self._cleanup(entry)
+
+    def claim(self, session_id, messages, timeout=10):
+        """Return the prepared thread id if it was seeded with exactly messages"""
+        with self._lock:
+            entry = self._pending.pop(session_id, None)
+        if entry is None:
+            return None
+        seed = [{"role": m["role"], "content": m["content"]} for m in messages]
+        if entry["seed"] != seed:
+            self._cleanup(entry)
+            return None
+        try:
+            return entry["future"].result(timeout=timeout)
+        except Exception:
+            self._cleanup(entry)
+            return None
+
+    def discard(self, session_id):
+        """Drop the session's unclaimed thread, if any"""
+        with self._lock:
+            entry = self._pending.pop(session_id, None)
+        if entry:
+            self._cleanup(entry)
+
+    def sweep(self):
+        """Delete threads nobody claimed within the ttl"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [sid for sid, entry in self._pending.items() if entry["created_at"] < cutoff]
+            entries = [self._pending.pop(sid) for sid in expired]
+        for entry in entries:
+            self._cleanup(entry)
+
+    def _create(self, seed):
+        # Ensure the client and its connection are warm before the first question
+        client = self.registry.get("azure_client")
+        if not client:
+            return None
+        return client.beta.threads.create(messages=seed).id
+
+    def _cleanup(self, entry):
+        # Deleting is a network call, so it never runs on the caller's thread
+        try:
+            self._executor.submit(self._delete, entry["future"])
+        except RuntimeError:
+            pass  # Interpreter shutting down
+
+    def _delete(self, future):
+        try:
+            thread_id = future.result()
+            if thread_id:
+                self.registry.get("azure_client").beta.threads.delete(thread_id)
+        except Exception:
+            pass
+
+@st.cache_resource
+def get_thread_prefetcher():
+    """Thread prefetcher shared by every session on this process"""
+    return ThreadPrefetcher(get_resource_registry())
+
+# ---------- Usage ----------
+class UsageTracker:
+    """Token usage per run, aggregated per category and hour.
+
+    Each run is appended as a JSON line to a local log, which is replayed on
+    start-up so totals and the hourly budget survive restarts. Once runs are
+    older than keep_hours the log is compacted: they are folded into a single
+    line of per-category totals, so the replay stays bounded.
+    """
+
+    def __init__(self, path, prices, keep_hours=24):
+        self.path = path
+        self.prices = prices
+        self.keep_hours = keep_hours
+        self.by_category = {}
+        self.by_hour = {}
+        self._archived = {}
+        self._recent = []
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if "archived" in entry:
+                            self._add_archived(entry["archived"])
+                        else:
+                            self._add(entry)
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        continue
+        except OSError:
+            return
+        self._compact()
+
+    def _add(self, entry):
+        add_usage(self.by_category.setdefault(entry["category"], new_usage_totals()), entry)
+        add_usage(self.by_hour.setdefault(entry["hour"], new_usage_totals()), entry)
+        self._recent.append(entry)
+
+    def _add_archived(self, archived):
+        for category, totals in archived.items():
+            for target in (self._archived, self.by_category):
+                merged = target.setdefault(category, new_usage_totals())
+                for key in merged:
+                    merged[key] += totals.get(key, 0)
+
+    def _cutoff(self):
+        return (datetime.now() - timedelta(hours=self.keep_hours)).strftime("%Y-%m-%d %H:00")
+
+    def _compact(self):
+        """Fold runs older than keep_hours into the archived totals and rewrite the log"""
+        cutoff = self._cutoff()
+        for hour in [hour for hour in self.by_hour if hour < cutoff]:
+            del self.by_hour[hour]
+        expired = [entry for entry in self._recent if entry["hour"] < cutoff]
+        if not expired:
+            return
+        for entry in expired:
+            add_usage(self._archived.setdefault(entry["category"], new_usage_totals()), entry)
+        self._recent = [entry for entry in self._recent if entry["hour"] >= cutoff]
+        try:
+            with open(self.path + ".tmp", "w") as f:
+                f.write(json.dumps({"archived": self._archived}) + "\n")
+                for entry in self._recent:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            pass
+
+    def record(self, run, session_id, category, history_chars, question_chars, tier="large", complexity=None):
+        """Record a run's usage and return the entry, or None if it has none"""
+        usage = getattr(run, "usage", None)
+        if not usage:
+            return None
+        prompt = usage.prompt_tokens or 0
+        completion = usage.completion_tokens or 0
+        # Rough split of the prompt at ~4 characters per token: what we resent as
+        # history, the new question, and the rest (instructions + file search)
+        history_est = history_chars // 4
+        question_est = question_chars // 4
+        prompt_cost, completion_cost = self.prices.get(tier, self.prices["large"])
+        now = datetime.now()
+        entry = {
+            "timestamp": now.isoformat(timespec="seconds"),
+            "hour": now.strftime("%Y-%m-%d %H:00"),
+            "session_id": session_id,
+            "category": category or "none",
+            "tier": tier,
+            "complexity": complexity,
+            "run_id": getattr(run, "id", None),
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": usage.total_tokens or prompt + completion,
+            "history_tokens_est": history_est,
+            "context_tokens_est": max(0, prompt - history_est - question_est),
+            "cost": round(
+                prompt / 1000 * prompt_cost + completion / 1000 * completion_cost,
+                6,
+            ),
+        }
+        with self._lock:
+            if self._recent and self._recent[0]["hour"] < self._cutoff():
+                self._compact()
+            self._add(entry)
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError:
+                pass
+        return entry
+
+    def hour_totals(self, hour=None):
+        hour = hour or datetime.now().strftime("%Y-%m-%d %H:00")
+        with self._lock:
+            return dict(self.by_hour.get(hour, new_usage_totals()))
+
+    def category_totals(self):
+        with self._lock:
+            return {category: dict(totals) for category, totals in self.by_category.items()}
+
+def new_usage_totals():
+    return {
+        "runs": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "history_tokens_est": 0,
+        "context_tokens_est": 0,
+        "cost": 0.0,
+    }
+
+def add_usage(totals, entry):
+    totals["runs"] += 1
+    for key in totals:
+        if key != "runs":
+            totals[key] += entry[key]
+
+@st.cache_resource
+def get_usage_tracker():
+    """Usage tracker shared by every session on this process"""
+    return UsageTracker(
+        get_secret("MAGNUS_USAGE_LOG", "usage_log.jsonl"),
+        {
+            "large": (
+                float(get_secret("PROMPT_COST_PER_1K", 0.01)),
+                float(get_secret("COMPLETION_COST_PER_1K", 0.03)),
+            ),
+            "fast": (
+                float(get_secret("FAST_PROMPT_COST_PER_1K", 0.0005)),
+                float(get_secret("FAST_COMPLETION_COST_PER_1K", 0.0015)),
+            ),
+        },
+        int(get_secret("USAGE_KEEP_HOURS", 24)),
+    )
+
+def usage_summary():
+    """Per-category totals and this hour's spend for the help panel"""
+    tracker = get_usage_tracker()
+    hour = tracker.hour_totals()
+    categories = " • ".join(
+        f"{category}: {totals['runs']} runs, {totals['total_tokens']:,} tokens, ${totals['cost']:.4f}"
+        for category, totals in sorted(tracker.category_totals().items())
+    )
+    return (
+        f"This hour: {hour['runs']} runs, {hour['total_tokens']:,} tokens, ${hour['cost']:.4f}"
+        + (f" | {categories}" if categories else "")
+    )
+
+def record_run_usage(run, history, question, tier="large", complexity=None):
+    """Add a run's usage to the session and process totals and check budgets"""
+    entry = get_usage_tracker().record(
+        run,
+        st.session_state.session_id,
+        st.session_state.current_category,
+        sum(len(m["content"]) for m in history),
+        len(question),
+        tier,
+        complexity,
+    )
+    if entry is None:
+        return
+    add_usage(st.session_state.usage_totals, entry)
+    
+    session_budget = int(get_secret("SESSION_TOKEN_BUDGET", 50000))
+    hourly_budget = float(get_secret("HOURLY_COST_BUDGET", 5.0))
+    if st.session_state.usage_totals["total_tokens"] > session_budget:
+        st.warning(f"⚠️ This session has used over {session_budget:,} tokens.")
+    if get_usage_tracker().hour_totals(entry["hour"])["cost"] > hourly_budget:
+        st.warning(f"⚠️ Spend this hour is over the ${hourly_budget:.2f} budget.")
+
+# ---------- Routing ----------
+# Words that suggest a diagnostic rather than a lookup
+DIAGNOSTIC_HINTS = (
+    "error", "not working", "doesn't work", "failed", "failing", "broken",
+    "why", "crash", "exception", "troubleshoot", "compare", "explain",
+)
+
+CATEGORY_COMPLEXITY = {"question": 0.0, "issue": 0.5, "problem": 0.75}
+
+# Replies that mean the fast tier could not answer and the large one should try
+UNANSWERED_HINTS = ("i couldn't find", "i could not find", "i don't know", "i'm not sure")
+
+def estimate_complexity(question, category):
+    """Cheap local score; at or above the threshold goes to the large tier"""
+    lowered = question.lower()
+    score = min(len(question.split()) / 40, 1.5)
+    score += 0.5 * max(question.count("?") - 1, 0)
+    score += 0.5 * sum(hint in lowered for hint in DIAGNOSTIC_HINTS)
+    if "\n" in question.strip() or "`" in question:
+        score += 0.5
+    return round(score + CATEGORY_COMPLEXITY.get(category, 0.0), 2)
+
+def route_question(question, category):
+    """Pick "fast" or "large" for a question and return (tier, complexity)"""
+    complexity = estimate_complexity(question, category)
+    threshold = float(get_secret("ROUTING_COMPLEXITY_THRESHOLD", 1.0))
+    if not get_secret("AZURE_FAST_ASSISTANT_ID") or complexity >= threshold:
+        return "large", complexity
+    return "fast", complexity
+
+def needs_escalation(success, response):
+    """Whether a fast-tier result should be retried on the large tier"""
+    if not success or not response:
+        return True
+    lowered = response.lower()
+    return any(hint in lowered for hint in UNANSWERED_HINTS)
+
+class RoutingStats:
+    """Routing decisions and latency per tier, for tuning the threshold"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tiers = {}
+
+    def record(self, tier, category, complexity, seconds, escalated):
+        with self._lock:
+            stats = self.tiers.setdefault(
+                tier, {"runs": 0, "seconds": 0.0, "escalated": 0, "complexity": 0.0, "categories": {}}
+            )
+            stats["runs"] += 1
+            stats["seconds"] += seconds
+            stats["escalated"] += escalated
+            stats["complexity"] += complexity
+            categories = stats["categories"]
+            categories[category or "none"] = categories.get(category or "none", 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                tier: {
+                    "runs": stats["runs"],
+                    "avg_seconds": stats["seconds"] / stats["runs"],
+                    "escalation_rate": stats["escalated"] / stats["runs"],
+                    "avg_complexity": stats["complexity"] / stats["runs"],
+                    "categories": dict(stats["categories"]),
+                }
+                for tier, stats in self.tiers.items()
+            }
+
+@st.cache_resource
+def get_routing_stats():
+    return RoutingStats()
+
+def routing_summary():
+    """One-line routing report for the help panel"""
+    snapshot = get_routing_stats().snapshot()
+    if not snapshot:
+        return "No questions routed yet"
+    return " • ".join(
+        f"{tier}: {stats['runs']} runs, {stats['avg_seconds']:.1f}s avg, "
+        f"{stats['escalation_rate']:.0%} escalated"
+        for tier, stats in sorted(snapshot.items())
+    )
+
+def get_tier_assistant(tier, default):
+    """Assistant for a tier, falling back to the large one"""
+    if tier == "fast":
+        try:
+            return get_resource("assistant_fast") or default
+        except Exception:
+            return default
+    return default
+
+def run_and_collect(client, thread_id, run_id, history, question, tier, complexity):
+    """Wait for a run, record its usage and return (success, run, response)"""
+    success, run_result = wait_for_run_completion(client, thread_id, run_id)
+    if run_result is not None:
+        record_run_usage(run_result, history, question, tier, complexity)
+    response = get_assistant_response(client, thread_id) if success else None
+    return success, run_result, response
+
+# ---------- Messages ----------
+ROLES = ("user", "assistant")
+
+class MessageLog:
+    """Compact, memory-capped chat history for one session.
+
+    Behaves like a list of {"role", "content"} dicts. Template texts are
+    shared, long bodies are zlib-compressed, and once the session goes over
+    its cap the oldest bodies are spilled to an anonymous temp file where
+    that frees memory. Sizes count the entry lists as well as the bodies.
+    """
+
+    COMPRESS_MIN = 256
+    KEEP_RESIDENT = 4
+
+    def __init__(self, messages=(), cap_bytes=None):
+        self.cap_bytes = cap_bytes if cap_bytes is not None else session_memory_cap()
+        self._entries = []
+        self._spill = None
+        self.raw_bytes = 0
+        self.resident_bytes = 0
+        self.spilled_bytes = 0
+        get_message_logs().add(self)
+        self.extend(messages)
+
+    def append(self, message):
+        content = message["content"]
+        self.raw_bytes += sys.getsizeof(content) + sys.getsizeof(dict(message))
+        template = get_message_templates().get(content)
+        role = ROLES.index(message["role"])
+        if template is not None:
+            entry = [role, "t", template]
+        else:
+            entry = [role, "s", content]
+            if len(content) >= self.COMPRESS_MIN:
+                packed = zlib.compress(content.encode("utf-8"))
+                if sys.getsizeof(packed) < sys.getsizeof(content):
+                    entry = [role, "z", packed]
+        self.resident_bytes += self._entry_bytes(entry)
+        self._entries.append(entry)
+        self._enforce_cap()
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def count(self, role):
+        """Number of messages with role, without decoding bodies"""
+        code = ROLES.index(role)
+        return sum(1 for entry in self._entries if entry[0] == code)
+
+    def close(self):
+        """Release the spill file"""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    @staticmethod
+    def _entry_bytes(entry):
+        """Memory held by one entry; shared templates only cost the list"""
+        size = sys.getsizeof(entry)
+        kind, payload = entry[1], entry[2]
+        if kind == "f":
+            size += sys.getsizeof(payload) + sum(sys.getsizeof(n) for n in payload)
+        elif kind != "t":
+            size += sys.getsizeof(payload)
+        return size
+
+    def _decode(self, entry):
+        role, kind, payload = entry
+        if kind == "z":
+            content = zlib.decompress(payload).decode("utf-8")
+        elif kind == "f":
+            offset, length = payload
+            self._spill.seek(offset)
+            content = zlib.decompress(self._spill.read(length)).decode("utf-8")
+        else:
+            content = payload
+        return {"role": ROLES[role], "content": content}
+
+    def _enforce_cap(self):
+        if self.resident_bytes <= self.cap_bytes:
+            return
+        for entry in self._entries[:-self.KEEP_RESIDENT]:
+            if self.resident_bytes <= self.cap_bytes:
+                break
+            if entry[1] not in ("s", "z"):
+                continue
+            packed = entry[2] if entry[1] == "z" else zlib.compress(entry[2].encode("utf-8"))
+            offset = 0
+            if self._spill is not None:
+                offset = self._spill.seek(0, os.SEEK_END)
+            spilled = [entry[0], "f", (offset, len(packed))]
+            before, after = self._entry_bytes(entry), self._entry_bytes(spilled)
+            # Short bodies cost less than the offset tuple plus their compressed copy
+            if after >= before or (entry[1] == "s" and after + len(packed) >= before):
+                continue
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(prefix="magnus-")
+            self._spill.write(packed)
+            self.resident_bytes += after - before
+            self.spilled_bytes += len(packed)
+            entry[1], entry[2] = spilled[1], spilled[2]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __iter__(self):
+        return (self._decode(entry) for entry in self._entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(entry) for entry in self._entries[index]]
+        return self._decode(self._entries[index])
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def report(self):
+        return {
+            "messages": len(self._entries),
+            "raw_bytes": self.raw_bytes,
+            "resident_bytes": self.resident_bytes + sys.getsizeof(self._entries),
+            "spilled_bytes": self.spilled_bytes,
+        }
+
+class MessageLogRegistry:
+    """Every live MessageLog on this process, for the memory report.
+
+    Sessions register from their own script threads, so adds and snapshots
+    share a lock rather than iterating the WeakSet while it may grow.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logs = weakref.WeakSet()
+
+    def add(self, log):
+        with self._lock:
+            self._logs.add(log)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._logs)
+
+@st.cache_resource
+def get_message_logs():
+    return MessageLogRegistry()
+
+def session_memory_cap():
+    return int(get_secret("SESSION_MEMORY_KB", 256)) * 1024
+
+def memory_summary():
+    """Session and process memory use of chat history for the footer"""
+    session = st.session_state.messages.report()
+    logs = [log for log in get_message_logs().snapshot() if log]
+    process_resident = sum(log.report()["resident_bytes"] for log in logs)
+    process_raw = sum(log.raw_bytes for log in logs)
+    saved = 1 - process_resident / process_raw if process_raw else 0.0
+    return (
+        f"history {session['resident_bytes'] / 1024:.1f} KB "
+        f"(+{session['spilled_bytes'] / 1024:.1f} KB on disk) • "
+        f"{len(logs)} sessions {process_resident / 1024:.0f} KB, {saved:.0%} saved"
+    )
+
+# Secrets are parsed on first access; time that on its own
+with profile_stage("load secrets"):
+    get_secret("LOGIN_PASSWORD")
+
+for name, seconds in IMPORT_TIMES.items():
+    get_startup_profiler().record_once(name, seconds)
+
+# Load CSS
+with profile_stage("inject css"):
+    load_css()
+
 # ---------- State ----------
+_state_started = time.perf_counter()
 for k, v in [
+    ("session_id", uuid.uuid4().hex),
     ("authenticated", False),
     ("assistant_ready", False),
-    ("messages", []),
+    ("messages", None),
     ("conversation_state", "initial"),
     ("current_category", None),
     ("thread_id", None),
+    ("thread_synced", 0),
     ("session_stats", {"questions": 0, "responses": 0}),
+    ("usage_totals", new_usage_totals()),
     ("show_help_panel", False),
     ("show_export_panel", False),
     ("follow_up_prompt", False),
@@ -425,24 +1488,125 @@ for k, v in [
     if k not in st.session_state:
         st.session_state[k] = v
 
+if st.session_state.messages is None:
+    st.session_state.messages = MessageLog()
+
+class SessionLease:
+    """Releases a session's shared resources when Streamlit drops the session.
+
+    Lives in session_state, so it is collected once the session ends, whether
+    by Logout or by the tab being closed and the session expiring. The
+    finalizer can run on any thread, so it only queues the session id; the
+    next script run does the release.
+    """
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        weakref.finalize(self, get_ended_sessions().put, session_id)
+
+@st.cache_resource
+def get_ended_sessions():
+    """Ids of sessions whose lease was collected, shared by the process"""
+    return queue.SimpleQueue()
+
+def release_ended_sessions():
+    """Release what ended sessions held in the registry and prefetcher"""
+    ended = get_ended_sessions()
+    while True:
+        try:
+            session_id = ended.get_nowait()
+        except queue.Empty:
+            return
+        get_thread_prefetcher().discard(session_id)
+        get_resource_registry().release(session_id)
+
+release_ended_sessions()
+if "session_lease" not in st.session_state:
+    st.session_state.session_lease = SessionLease(st.session_state.session_id)
+
+get_startup_profiler().record("session state", time.perf_counter() - _state_started)
+
 def logout():
     """Enhanced logout with confirmation"""
+    get_thread_prefetcher().discard(st.session_state.get("session_id"))
+    get_resource_registry().release(st.session_state.get("session_id"))
+    if st.session_state.get("messages") is not None:
+        st.session_state.messages.close()
     for key in list(st.session_state.keys()):
         del st.session_state[key]
-    st.cache_resource.clear()
     st.rerun()
 
 def reset_chat():
     """Enhanced chat reset"""
-    st.session_state.messages = []
+    get_thread_prefetcher().discard(st.session_state.session_id)
+    st.session_state.messages.close()
+    st.session_state.messages = MessageLog()
     st.session_state.conversation_state = "initial"
     st.session_state.current_category = None
     st.session_state.thread_id = None
+    st.session_state.thread_synced = 0
     st.session_state.session_stats = {"questions": 0, "responses": 0}
     st.session_state.follow_up_prompt = False
     st.session_state.show_help_panel = False
     st.session_state.show_export_panel = False
 
+# ---------- Categories ----------
+CATEGORY_TEXT = {
+    "question": "Question - you need information or guidance",
+    "change": "Change - you want to suggest an improvement",
+    "issue": "Issue - something isn't working as expected", 
+    "problem": "Problem - you're experiencing a technical difficulty"
+}
+
+CATEGORY_REPLIES = {
+    "question": "Great! What would you like to know? Just ask me anything about work processes, systems, or policies.",
+    "issue": "I understand you're having an issue. Can you tell me what's happening? I'll help you figure it out.",
+    "problem": "I'm here to help with your problem. What's going wrong? Let me see what I can find to help.",
+    "change": """Perfect! I love hearing improvement ideas.
+
+The best way to submit your suggestion is through our Innovation Request form:
+
+🔗 **[Submit Innovation Request](https://www.jotform.com/form/250841782712054)**
+
+This ensures your idea gets to the right people and gets proper consideration.""",
+}
+
+def welcome_message(time_greeting):
+    return f"""👋 **Welcome to MAGnus!**
+
+Hey there! How are you doing {time_greeting}? 
+
+I'm MAGnus, your friendly AI assistant here to help with anything work-related. What can I help you with today?"""
+
+def confirmation_messages(category):
+    """Messages appended to the chat once a category is confirmed"""
+    return [
+        {"role": "assistant", "content": f"You've chosen **{CATEGORY_TEXT[category]}**. Is that correct?"},
+        {"role": "user", "content": "Yes, that's right"},
+        {"role": "assistant", "content": CATEGORY_REPLIES[category]},
+    ]
+
+@st.cache_resource
+def get_message_templates():
+    """Static texts shared by every session.
+
+    A message whose content matches one of these stores a reference to the
+    single process-wide copy instead of its own string.
+    """
+    texts = [welcome_message(g) for g in ("this morning", "this afternoon", "this evening", "today")]
+    texts += [m["content"] for category in CATEGORY_TEXT for m in confirmation_messages(category)]
+    return {text: text for text in texts}
+
+def choose_category(category):
+    """Move to confirmation and start preparing the thread in the background"""
+    st.session_state.conversation_state = f"confirm_{category}"
+    if category != "change" and AZURE_OPENAI_AVAILABLE:
+        get_thread_prefetcher().prepare(
+            st.session_state.session_id,
+            st.session_state.messages + confirmation_messages(category),
+        )
+    st.rerun()
+
 # ---------- Screens ----------
 def show_login():
     """Enhanced login screen"""
@@ -479,8 +1643,7 @@ def show_login():
         if username == "MAG" and st.secrets.get("LOGIN_PASSWORD", "defaultpassword") == password:
             st.session_state.authenticated = True
             st.session_state.assistant_ready = False
-            st.success("✅ Login successful! Initializing your assistant...")
-            time.sleep(1)
+            st.session_state.login_at = time.perf_counter()
             st.rerun()
         else:
             st.error("❌ Invalid username or password. Please try again.")
@@ -494,27 +1657,24 @@ def show_assistant_setup():
     </div>
     """, unsafe_allow_html=True)
     
-    progress_container = st.container()
+    warmup = get_warmup()
+    pending = warmup.pending()
     
-    with progress_container:
-        prog = st.progress(0, "Starting initialization...")
+    with st.container():
+        # Only show progress for work the warm-up has not already finished
+        prog = st.progress(0, "Starting initialization...") if pending else None
         status = st.empty()
         
-        # Check Azure OpenAI availability
-        status.info("🔍 Checking Azure OpenAI connection...")
-        prog.progress(25, "Checking Azure OpenAI...")
-        time.sleep(0.5)
-        
         if not AZURE_OPENAI_AVAILABLE:
             status.error("❌ Azure OpenAI library not available")
             if st.button("🚪 Return to Login"):
                 logout()
             return
         
-        # Get Azure client
-        status.info("🔗 Connecting to Azure OpenAI...")
-        prog.progress(50, "Connecting to Azure...")
-        time.sleep(0.5)
+        labels = dict(Warmup.STAGES)
+        if "azure_client" in pending:
+            status.info(labels["azure_client"])
+            prog.progress(33, "Connecting to Azure...")
         
         client = get_azure_client()
         if not client:
@@ -523,10 +1683,9 @@ def show_assistant_setup():
                 logout()
             return
         
-        # Get or create assistant
-        status.info("⚙️ Setting up AI Assistant...")
-        prog.progress(75, "Setting up assistant...")
-        time.sleep(0.5)
+        if "assistant" in pending:
+            status.info(labels["assistant"])
+            prog.progress(66, "Setting up assistant...")
         
         assistant = get_or_create_assistant(client)
         if not assistant:
@@ -534,20 +1693,21 @@ def show_assistant_setup():
                 logout()
             return
         
-        # Success
-        status.success("✅ Assistant ready!")
-        prog.progress(100, "Ready!")
-        time.sleep(0.5)
+        login_at = st.session_state.pop("login_at", None)
+        if login_at is not None:
+            st.session_state.login_to_ready = time.perf_counter() - login_at
+            warmup.record_ready(st.session_state.login_to_ready)
         
         st.session_state.assistant_ready = True
         st.rerun()
 
 def show_main_app():
     """Enhanced main application interface using pure Streamlit components"""
+    inject_top_bar_css()
     
     # Get session stats
-    user_msgs = len([m for m in st.session_state.messages if m["role"] == "user"])
-    ai_msgs = len([m for m in st.session_state.messages if m["role"] == "assistant"])
+    user_msgs = st.session_state.messages.count("user")
+    ai_msgs = st.session_state.messages.count("assistant")
     
     # Create top bar using pure Streamlit with targeted CSS
     st.markdown("""
@@ -583,13 +1743,14 @@ def show_main_app():
     st.markdown('<div class="top-status-bar">', unsafe_allow_html=True)
     
     # Use Streamlit columns for layout
-    status_col, info_col, stats_col1, stats_col2 = st.columns([2, 4, 1, 1])
+    status_col, info_col, stats_col1, stats_col2, stats_col3 = st.columns([2, 3, 1, 1, 1])
     
     with status_col:
         st.markdown("🟢 **MAGnus Online**")
     
     with info_col:
-        st.markdown("GPT-4 Turbo • Azure AI Foundry • File Search Enabled")
+        model = st.session_state.get("last_model") or "GPT-4 Turbo"
+        st.markdown(f"{model} • Azure AI Foundry • File Search Enabled")
     
     with stats_col1:
         st.metric("Questions", user_msgs)
@@ -597,6 +1758,18 @@ def show_main_app():
     with stats_col2:
         st.metric("Responses", ai_msgs)
     
+    with stats_col3:
+        usage = st.session_state.usage_totals
+        st.metric(
+            "Tokens",
+            f"{usage['total_tokens']:,}",
+            help=(
+                f"Prompt {usage['prompt_tokens']:,} (history ~{usage['history_tokens_est']:,}, "
+                f"file search ~{usage['context_tokens_est']:,}) • "
+                f"Completion {usage['completion_tokens']:,} • ${usage['cost']:.4f}"
+            ),
+        )
+    
     # Close container
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -617,10 +1790,13 @@ def show_main_app():
             st.session_state.show_help_panel = not st.session_state.show_help_panel
         if st.session_state.show_help_panel:
             st.info("💬 Type your work-related questions in the chat below!")
+            st.caption(f"🧭 Routing: {routing_summary()}")
+            st.caption(f"🪙 Usage: {usage_summary()}")
 
     with col4:
         if st.button("🔄 Refresh", use_container_width=True):
-            st.cache_resource.clear()
+            if get_resource_registry().refresh():
+                get_warmup().start()
             st.rerun()
 
     with col5:
@@ -630,11 +1806,11 @@ def show_main_app():
             if st.session_state.messages:
                 export_data = {
                     "timestamp": datetime.now().isoformat(),
-                    "messages": st.session_state.messages
+                    "messages": list(st.session_state.messages)
                 }
                 st.download_button(
                     "📥 Download Chat History",
-                    data=str(export_data),
+                    data=json.dumps(export_data, ensure_ascii=False),
                     file_name=f"magnus_chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                     mime="application/json",
                     key="download_history"
@@ -658,13 +1834,7 @@ def show_main_app():
     with chat_container:
         # Initial welcome message
         if not st.session_state.messages and st.session_state.conversation_state == "initial":
-            time_greeting = get_time_greeting()
-            welcome = f"""👋 **Welcome to MAGnus!**
-
-Hey there! How are you doing {time_greeting}? 
-
-I'm MAGnus, your friendly AI assistant here to help with anything work-related. What can I help you with today?"""
-            
+            welcome = welcome_message(get_time_greeting())
             st.session_state.messages.append({"role": "assistant", "content": welcome})
             st.session_state.conversation_state = "show_options"
 
@@ -702,70 +1872,38 @@ I'm MAGnus, your friendly AI assistant here to help with anything work-related.
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🤔 I have a Question", use_container_width=True, key="question_btn"):
-                    st.session_state.conversation_state = "confirm_question"
-                    st.rerun()
+                    choose_category("question")
                 if st.button("⚠️ I have an Issue", use_container_width=True, key="issue_btn"):
-                    st.session_state.conversation_state = "confirm_issue"
-                    st.rerun()
+                    choose_category("issue")
             
             with col2:
                 if st.button("📄 I want to suggest a Change", use_container_width=True, key="change_btn"):
-                    st.session_state.conversation_state = "confirm_change"
-                    st.rerun()
+                    choose_category("change")
                 if st.button("🔧 I have a Problem", use_container_width=True, key="problem_btn"):
-                    st.session_state.conversation_state = "confirm_problem"
-                    st.rerun()
+                    choose_category("problem")
             return
 
         # Confirmation flows
         if st.session_state.conversation_state.startswith("confirm_"):
             category = st.session_state.conversation_state.replace("confirm_", "")
-            category_text = {
-                "question": "Question - you need information or guidance",
-                "change": "Change - you want to suggest an improvement",
-                "issue": "Issue - something isn't working as expected", 
-                "problem": "Problem - you're experiencing a technical difficulty"
-            }
             
-            display_message_with_custom_avatar("assistant", f"You've chosen **{category_text[category]}**. Is that correct?")
+            display_message_with_custom_avatar("assistant", f"You've chosen **{CATEGORY_TEXT[category]}**. Is that correct?")
             
             col1, col2 = st.columns([1, 1])
             with col1:
                 if st.button("✅ Yes, that's right", use_container_width=True, key=f"confirm_{category}"):
                     st.session_state.current_category = category
-                    st.session_state.messages.append({
-                        "role": "assistant", 
-                        "content": f"You've chosen **{category_text[category]}**. Is that correct?"
-                    })
-                    st.session_state.messages.append({
-                        "role": "user", 
-                        "content": "Yes, that's right"
-                    })
+                    st.session_state.messages.extend(confirmation_messages(category))
                     
                     if category == "change":
-                        msg = """Perfect! I love hearing improvement ideas.
-
-The best way to submit your suggestion is through our Innovation Request form:
-
-🔗 **[Submit Innovation Request](https://www.jotform.com/form/250841782712054)**
-
-This ensures your idea gets to the right people and gets proper consideration."""
-                        st.session_state.messages.append({"role": "assistant", "content": msg})
                         st.session_state.conversation_state = "completed"
                     else:
-                        if category == "question":
-                            msg = "Great! What would you like to know? Just ask me anything about work processes, systems, or policies."
-                        elif category == "issue":
-                            msg = "I understand you're having an issue. Can you tell me what's happening? I'll help you figure it out."
-                        else:  # problem
-                            msg = "I'm here to help with your problem. What's going wrong? Let me see what I can find to help."
-                        
-                        st.session_state.messages.append({"role": "assistant", "content": msg})
                         st.session_state.conversation_state = "ready_for_questions"
                     st.rerun()
             
             with col2:
                 if st.button("❌ No, let me choose again", use_container_width=True, key=f"reject_{category}"):
+                    get_thread_prefetcher().discard(st.session_state.session_id)
                     st.session_state.conversation_state = "show_options"
                     st.rerun()
             return
@@ -825,19 +1963,59 @@ This ensures your idea gets to the right people and gets proper consideration.""
                 """, unsafe_allow_html=True)
                 
                 with st.spinner("Processing..."):
-                    # Create thread and run
-                    thread_id, run_id = create_thread_and_run(client, assistant.id, assistant_messages)
+                    # Reuse a thread that already holds the history, else create one
+                    history = st.session_state.messages[:-1]
+                    thread_id = st.session_state.thread_id
+                    if not thread_id or st.session_state.thread_synced != len(history):
+                        thread_id = get_thread_prefetcher().claim(st.session_state.session_id, history)
+                    
+                    # Simple lookups go to the fast tier, everything else to the large one
+                    category = st.session_state.current_category
+                    tier, complexity = route_question(user_input, category)
+                    tier_assistant = get_tier_assistant(tier, assistant)
+                    if tier_assistant is assistant:
+                        tier = "large"
+                    
+                    started = time.perf_counter()
+                    if thread_id:
+                        run_id = add_message_and_run(client, thread_id, tier_assistant.id, user_input)
+                    else:
+                        thread_id, run_id = create_thread_and_run(client, tier_assistant.id, assistant_messages)
                     
                     if thread_id and run_id:
                         st.session_state.thread_id = thread_id
-                        success, run_result = wait_for_run_completion(client, thread_id, run_id)
+                        st.session_state.thread_synced = 0
+                        success, run_result, response = run_and_collect(
+                            client, thread_id, run_id, history, user_input, tier, complexity
+                        )
+                        escalated = tier == "fast" and needs_escalation(success, response)
+                        get_routing_stats().record(tier, category, complexity, time.perf_counter() - started, escalated)
+                        
+                        if escalated:
+                            # A fresh thread keeps the fast tier's reply out of the large run
+                            tier, tier_assistant = "large", assistant
+                            started = time.perf_counter()
+                            fast_thread_id = thread_id
+                            thread_id, run_id = create_thread_and_run(client, assistant.id, assistant_messages)
+                            try:
+                                client.beta.threads.delete(fast_thread_id)
+                            except Exception:
+                                pass
+                            success, run_result, response = False, None, None
+                            if thread_id and run_id:
+                                st.session_state.thread_id = thread_id
+                                success, run_result, response = run_and_collect(
+                                    client, thread_id, run_id, history, user_input, tier, complexity
+                                )
+                            get_routing_stats().record(tier, category, complexity, time.perf_counter() - started, False)
                         
                         if success:
-                            response = get_assistant_response(client, thread_id)
                             if response:
                                 loading_container.empty()
                                 typing_effect_with_avatar(response, "assistant")
                                 st.session_state.messages.append({"role": "assistant", "content": response})
+                                st.session_state.last_model = getattr(tier_assistant, "model", None)
+                                st.session_state.thread_synced = len(st.session_state.messages)
                                 st.session_state.follow_up_prompt = True
                             else:
                                 loading_container.markdown("❌ Could not retrieve assistant response.")
@@ -849,16 +2027,27 @@ This ensures your idea gets to the right people and gets proper consideration.""
     st.markdown("---")
     footer_col1, footer_col2, footer_col3 = st.columns(3)
     with footer_col1:
-        st.caption("🤖 MAGnus Knowledge Bot v2.0")
+        st.caption(f"🤖 MAGnus Knowledge Bot v2.0 • {memory_summary()}")
     with footer_col2:
-        st.caption("⚡ Powered by Azure AI Foundry")
+        st.caption(f"⚡ Powered by Azure AI Foundry • {transport_summary()}")
     with footer_col3:
-        st.caption(f"🕐 Session started: {datetime.now().strftime('%H:%M')}")
+        ready_in = st.session_state.get("login_to_ready")
+        ready_note = f" • ready in {ready_in:.2f}s" if ready_in is not None else ""
+        st.caption(f"🕐 Session started: {datetime.now().strftime('%H:%M')}{ready_note}")
 
 # ---------- Router ----------
 if not st.session_state.authenticated:
-    show_login()
+    with profile_stage("render login"):
+        show_login()
+    get_startup_profiler().record_once(COLD_START_STAGE, time.perf_counter() - SCRIPT_STARTED)
 elif not st.session_state.assistant_ready:
-    show_assistant_setup()
+    with profile_stage("render setup"):
+        show_assistant_setup()
 else:
-    show_main_app()
+    with profile_stage("render main"):
+        show_main_app()
+
+# Started after the first render so the login page goes out before any of the
+# AI stack is imported
+get_warmup()
+show_startup_profile()
@@ -0,0 +1,229 @@
+"""Lightweight Markdown to HTML for chat messages.
+
+Supports **bold**, *italic*, `code`, "- " lists and paragraphs. Each line is
+split once into text and delimiter tokens, and the matching closer for every
+delimiter is found by a cursor that only moves forward, so rendering is
+linear in the input however many unmatched * or ` characters it contains.
+
+Run this file directly for a micro-benchmark against the previous regex
+implementation.
+"""
+import re
+from html import escape
+
+DELIMITERS = re.compile(r"(\*+|`)")
+
+def tokenize(line):
+    """Split a line into alternating text and delimiter tokens
+
+    Odd indices hold the delimiters "**", "*" and "`"; even indices hold the
+    (possibly empty) text between them. A run of three or more stars becomes
+    "**" pairs and a literal star, so only a star with no star beside it can
+    open or close italics.
+    """
+    tokens = DELIMITERS.split(line)
+    if "***" not in line:
+        return tokens
+    expanded = [tokens[0]]
+    for index in range(1, len(tokens), 2):
+        run, text = tokens[index], tokens[index + 1]
+        if len(run) > 2:
+            expanded.extend(["**", ""] * (len(run) // 2 - 1))
+            text = "*" * (len(run) % 2) + text
+            run = "**"
+        expanded.extend([run, text])
+    return expanded
+
+class _Closers:
+    """Finds the next delimiter of a kind at or after an index.
+
+    Lookups only ever move forward, so one cursor per kind keeps the total
+    work linear in the number of tokens.
+    """
+
+    def __init__(self, tokens):
+        self._positions = {"**": [], "*": [], "`": []}
+        for index in range(1, len(tokens), 2):
+            self._positions[tokens[index]].append(index)
+        self._cursor = {"**": 0, "*": 0, "`": 0}
+
+    def find(self, delim, start):
+        positions = self._positions[delim]
+        cursor = self._cursor[delim]
+        while cursor < len(positions) and positions[cursor] < start:
+            cursor += 1
+        self._cursor[delim] = cursor
+        return positions[cursor] if cursor < len(positions) else None
+
+_TAGS = {"**": "strong", "*": "em", "`": "code"}
+
+def _render_span(tokens, closers, start, end, out):
+    i = start
+    while i < end:
+        token = tokens[i]
+        if i & 1:
+            close = closers.find(token, i + 2)
+            if close == i + 2 and not tokens[i + 1]:
+                # Spans need at least one character of content
+                close = closers.find(token, i + 4)
+            if close is not None and close < end:
+                tag = _TAGS[token]
+                out.append(f"<{tag}>")
+                if token == "`":
+                    out.append("".join(tokens[i + 1:close]))
+                else:
+                    _render_span(tokens, closers, i + 1, close, out)
+                out.append(f"</{tag}>")
+                i = close + 1
+                continue
+        out.append(token)
+        i += 1
+
+def format_inline(line):
+    """Render bold, italic and code spans within one line"""
+    line = escape(line)
+    if "*" not in line and "`" not in line:
+        return line
+    tokens = tokenize(line)
+    out = []
+    _render_span(tokens, _Closers(tokens), 0, len(tokens), out)
+    return "".join(out)
+
+class _Blocks:
+    """Paragraph and list state while lines are added one at a time"""
+
+    def __init__(self, inline=None):
+        self.inline = inline or format_inline
+        self.parts = []
+        self.buffer = []
+        self.in_list = False
+
+    def add(self, line):
+        stripped = line.strip()
+        if stripped.startswith("- "):
+            self._flush()
+            if not self.in_list:
+                self.parts.append("<ul>")
+                self.in_list = True
+            self.parts.append(f"<li>{self.inline(stripped[2:].strip())}</li>")
+        elif stripped == "":
+            self._flush()
+            self._close_list()
+        else:
+            self._close_list()
+            self.buffer.append(self.inline(stripped))
+
+    def html(self):
+        """Rendered output so far, without changing the state"""
+        parts = list(self.parts)
+        if self.buffer:
+            parts.append(f"<p>{'<br>'.join(self.buffer)}</p>")
+        if self.in_list:
+            parts.append("</ul>")
+        return "".join(parts) or "<p></p>"
+
+    def copy(self):
+        other = _Blocks(self.inline)
+        other.parts = list(self.parts)
+        other.buffer = list(self.buffer)
+        other.in_list = self.in_list
+        return other
+
+    def _flush(self):
+        if self.buffer:
+            self.parts.append(f"<p>{'<br>'.join(self.buffer)}</p>")
+            self.buffer = []
+
+    def _close_list(self):
+        if self.in_list:
+            self.parts.append("</ul>")
+            self.in_list = False
+
+def format_message_content(text):
+    """Convert lightweight Markdown to HTML for display"""
+    if not text:
+        return ""
+    blocks = _Blocks()
+    for line in text.split("\n"):
+        blocks.add(line)
+    return blocks.html()
+
+class IncrementalFormatter:
+    """Renders successive prefixes of one message.
+
+    Complete lines are formatted once and kept; each call only formats the
+    trailing, still-growing line. A text that does not extend the previous one
+    starts over.
+    """
+
+    def __init__(self):
+        self._committed = ""
+        self._blocks = _Blocks()
+
+    def render(self, text):
+        if not text:
+            return ""
+        if not text.startswith(self._committed):
+            self._committed = ""
+            self._blocks = _Blocks()
+        end = text.rfind("\n") + 1
+        if end > len(self._committed):
+            for line in text[len(self._committed):end - 1].split("\n"):
+                self._blocks.add(line)
+            self._committed = text[:end]
+        blocks = self._blocks.copy()
+        blocks.add(text[end:])
+        return blocks.html()
+
+# ---------- Benchmark ----------
+def _legacy_format(text):
+    """The regex chain this module replaced, kept for comparison"""
+    if not text:
+        return ""
+    safe_text = escape(text)
+    safe_text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", safe_text)
+    safe_text = re.sub(r"(?<!\*)\*(?!\*)(.+?)(?<!\*)\*(?!\*)", r"<em>\1</em>", safe_text)
+    safe_text = re.sub(r"`(.+?)`", r"<code>\1</code>", safe_text)
+    # Inline markup is already applied, so only the block logic is shared
+    blocks = _Blocks(inline=lambda line: line)
+    for line in safe_text.split("\n"):
+        blocks.add(line)
+    return blocks.html()
+
+_REALISTIC = """👋 **Welcome to MAGnus!**
+
+To book annual leave, open the *HR portal* and choose `Requests > Leave`.
+
+- Check your **remaining allowance** first
+- Submit at least *two weeks* ahead
+- Your manager approves it in `Approvals`
+
+If the portal shows an error, raise an **IT ticket** with the error code.
+"""
+
+def _benchmark_cases():
+    return {
+        "realistic": _REALISTIC * 20,
+        "unmatched stars": "*a " * 20000,
+        "unmatched ticks": "`a " * 20000,
+        "star runs": "***a**" * 10000,
+        "mixed": "**a `b *c" * 10000,
+    }
+
+def benchmark(repeat=5):
+    """Time both implementations on realistic and adversarial inputs"""
+    import timeit
+
+    print(f"{'case':<18}{'chars':>8}{'regex ms':>11}{'single ms':>11}{'prefix ms':>11}  same")
+    for name, text in _benchmark_cases().items():
+        legacy = min(timeit.repeat(lambda: _legacy_format(text), number=1, repeat=repeat))
+        single = min(timeit.repeat(lambda: format_message_content(text), number=1, repeat=repeat))
+        # Cost per frame of a typing effect near the end of the message
+        formatter = IncrementalFormatter()
+        formatter.render(text[:-10])
+        prefix = min(timeit.repeat(lambda: formatter.render(text[:-5]), number=1, repeat=repeat))
+        same = _legacy_format(text) == format_message_content(text)
+        print(f"{name:<18}{len(text):>8}{legacy * 1000:>11.2f}{single * 1000:>11.2f}{prefix * 1000:>11.2f}  {same}")
+
+if __name__ == "__main__":
+    benchmark()